@@ -1,15 +1,18 @@
 // KVCache Hit Rate Calculator JavaScript implementation
 
+// Bytes per element for each data type, built once at load time
+const DTYPE_BYTES = Object.freeze({
+    'fp32': 4,
+    'fp16': 2,
+    'bf16': 2,
+    'fp8': 1,
+    'int8': 1,
+    'int4': 0.5
+});
+
 class KVCacheCalculator {
     constructor() {
-        this.dtypeBytes = {
-            'fp32': 4,
-            'fp16': 2,
-            'bf16': 2,
-            'fp8': 1,
-            'int8': 1,
-            'int4': 0.5
-        };
+        this.dtypeBytes = DTYPE_BYTES;
     }
 
     calculateModelMemoryGb(modelConfig) {
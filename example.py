@@ -6,13 +6,13 @@ This example demonstrates how to use the KVCacheCalculator to analyze the
 performance of KVCache under different configurations.
 """
 
-from kvcache_calculator import (
-    KVCacheCalculator, ModelConfig, SystemConfig, ConversationPattern,
-    ModelDtype, KVCacheDtype
-)
-import json
-
 def main():
+    # Imported here so that importing this module (e.g. for print_metrics) stays cheap
+    from kvcache_calculator import (
+        KVCacheCalculator, ModelConfig, SystemConfig, ConversationPattern,
+        ModelDtype, KVCacheDtype
+    )
+    
     # Initialize the calculator
     calculator = KVCacheCalculator()
     
@@ -104,21 +104,31 @@ def main():
     llama3_memory = calculator.calculate_kvcache_memory_per_token(llama3_model_config)
     qwen_memory = calculator.calculate_kvcache_memory_per_token(qwen_model_config)
     
-    print(f"  Mistral-24B: {mistral_memory:,} bytes/token")
-    print(f"  Llama3-8B:   {llama3_memory:,} bytes/token")
-    print(f"  Qwen3-32B:   {qwen_memory:,} bytes/token")
+    print(f"  Mistral-24B: {mistral_memory:,.0f} bytes/token")
+    print(f"  Llama3-8B:   {llama3_memory:,.0f} bytes/token")
+    print(f"  Qwen3-32B:   {qwen_memory:,.0f} bytes/token")
+    
+    # Compare KVCache data types for the same architecture in one array operation
+    print(f"\n🗜️ KVCache Data Type Comparison (Mistral-24B):")
+    dtype_memory = calculator.calculate_kvcache_memory_per_token_all_dtypes(model_config)
+    fp16_memory = dtype_memory[list(KVCacheDtype).index(KVCacheDtype.FP16)]
+    change_vs_fp16 = (dtype_memory - fp16_memory) / fp16_memory * 100
+    for dtype, memory, change in zip(KVCacheDtype, dtype_memory, change_vs_fp16):
+        print(f"  {dtype.value.upper():<5} {memory:>9,.0f} bytes/token ({change:+.0f}% vs FP16)")
 
 def print_metrics(metrics, config_name):
     """Print formatted metrics results"""
     print(f"Configuration: {config_name}")
-    print(f"  📈 KVCache Hit Rate: {metrics['hit_rate']:.1%}")
-    print(f"  💾 Cache Utilization: {metrics['cache_utilization']:.1%}")
-    print(f"  🔄 System QPS: {metrics['derived_qps']:.1f} req/s")
-    print(f"  🗂️ Cache Memory Usage: {metrics['cache_memory_gb']:.2f} GB")
-    print(f"  🔢 Memory per Token: {metrics['memory_per_token_bytes']:.0f} bytes")
-    print(f"  💬 Average Cached Conversations: {metrics['avg_cached_conversations']:.1f}")
-    print(f"  🎯 Cache Hits per Second: {metrics['cache_hits_per_second']:.1f}")
-    print(f"  🚀 Tokens per Second: {metrics['tokens_per_second']:.1f}")
+    print(f"  📈 KVCache Hit Rate: {metrics.hit_rate:.1%}")
+    print(f"  💾 Cache Utilization: {metrics.cache_utilization:.1%}")
+    print(f"  🔄 System QPS: {metrics.derived_qps:.1f} req/s")
+    print(f"  🗂️ Cache Memory Usage: {metrics.cache_memory_gb:.2f} GB")
+    print(f"  🔢 Memory per Token: {metrics.memory_per_token_bytes:.0f} bytes")
+    print(f"  🗜️ KVCache Compression vs FP16: {metrics.kv_compression_ratio:.2f}x")
+    print(f"  🧩 KVCache Saved by GQA vs MHA: {metrics.memory_saved_vs_mha_pct:.1f}%")
+    print(f"  💬 Average Cached Conversations: {metrics.avg_cached_conversations:.1f}")
+    print(f"  🎯 Cache Hits per Second: {metrics.cache_hits_per_second:.1f}")
+    print(f"  🚀 Tokens per Second: {metrics.tokens_per_second:.1f}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
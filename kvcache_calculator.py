@@ -4,28 +4,63 @@ KVCache Hit Rate Calculator
 A tool specifically designed to model and calculate the hit rate of KVCache in LLM inference services
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
 
-class ModelDtype(Enum):
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # Numba is optional: kernels run as plain Python, batch APIs use NumPy
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+_GIB = 1024**3          # Bytes per GiB
+_INV_GIB = 1.0 / _GIB   # Multiply instead of dividing by _GIB
+
+MODEL_OVERHEAD_FACTOR = 1.2  # Runtime memory overhead on top of model weights
+
+class _SizedDtype(Enum):
+    """Data type whose members also carry their size, so no lookup table is needed"""
+    
+    def __new__(cls, value: str, bytes_per_element: float):
+        member = object.__new__(cls)
+        member._value_ = value
+        member.bytes_per_element = bytes_per_element  # Bytes per element
+        return member
+
+class ModelDtype(_SizedDtype):
     """Model data type"""
-    FP16 = "fp16"
-    FP32 = "fp32"
-    BF16 = "bf16"
-    FP8 = "fp8"
-    INT8 = "int8"
-    INT4 = "int4"
-
-class KVCacheDtype(Enum):
+    FP16 = ("fp16", 2.0)
+    FP32 = ("fp32", 4.0)
+    BF16 = ("bf16", 2.0)
+    FP8 = ("fp8", 1.0)
+    INT8 = ("int8", 1.0)
+    INT4 = ("int4", 0.5)
+
+class KVCacheDtype(_SizedDtype):
     """KVCache data type"""
-    FP16 = "fp16"
-    FP32 = "fp32"
-    BF16 = "bf16"
-    FP8 = "fp8"
-    INT8 = "int8"
+    FP16 = ("fp16", 2.0)
+    FP32 = ("fp32", 4.0)
+    BF16 = ("bf16", 2.0)
+    FP8 = ("fp8", 1.0)
+    INT8 = ("int8", 1.0)
+
+# Bytes per element for each data type, exposed as KVCacheCalculator.dtype_bytes
+_DTYPE_BYTES = {dtype: dtype.bytes_per_element for dtype in (*ModelDtype, *KVCacheDtype)}
+
+# Bytes per element for every KVCache data type, in KVCacheDtype declaration order
+_KV_DTYPE_BYTES = np.array([dtype.bytes_per_element for dtype in KVCacheDtype], dtype=np.float64)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ModelConfig:
     """Model configuration parameters"""
     num_layers: int
@@ -35,13 +70,52 @@ class ModelConfig:
     model_dtype: ModelDtype
     kvcache_dtype: KVCacheDtype
     model_size_gb: float  # Model size (GB)
+    bytes_per_element: float = field(init=False, repr=False, compare=False)  # KVCache bytes per element, derived from kvcache_dtype
+    gqa_ratio: float = field(init=False, repr=False, compare=False)  # Query heads per KV head, 1 for MHA
+    memory_per_token: float = field(init=False, repr=False, compare=False)  # KVCache bytes per token
+    model_overhead_gb: float = field(init=False, repr=False, compare=False)  # Model memory including runtime overhead (GB)
+
+    def __post_init__(self):
+        if (self.num_kv_heads <= 0 or self.num_attention_heads <= 0 or
+                self.num_attention_heads % self.num_kv_heads != 0):
+            raise ValueError(f"num_attention_heads ({self.num_attention_heads}) must be a positive multiple "
+                             f"of num_kv_heads ({self.num_kv_heads})")
+        # Frozen dataclass: derived fields are set once, bypassing __setattr__
+        object.__setattr__(self, "bytes_per_element", self.kvcache_dtype.bytes_per_element)
+        object.__setattr__(self, "gqa_ratio", self.num_attention_heads / self.num_kv_heads)
+        # KVCache contains Key and Value, each layer has
+        # Memory = 2 (K+V) * num_layers * num_kv_heads * head_dim * dtype_bytes
+        object.__setattr__(self, "memory_per_token",
+                           2 * self.num_layers * self.num_kv_heads * self.head_dim * self.bytes_per_element)
+        object.__setattr__(self, "model_overhead_gb", self.model_size_gb * MODEL_OVERHEAD_FACTOR)
 
-@dataclass  
+class EvictionPolicy(Enum):
+    """KVCache eviction policy"""
+    LRU = "lru"
+    W_TINYLFU = "w-tinylfu"
+    PRIORITY = "priority"
+
+# Policy codes used by the cache-ratio models (Numba kernels cannot take Enums)
+_EVICTION_POLICY_CODES = {
+    EvictionPolicy.LRU: 0,
+    EvictionPolicy.W_TINYLFU: 1,
+    EvictionPolicy.PRIORITY: 2,
+}
+
+@dataclass(frozen=True, slots=True)
 class SystemConfig:
     """System configuration parameters"""
     available_memory_gb: float  # Available memory (GB)
+    eviction_policy: EvictionPolicy = EvictionPolicy.LRU
+    pinned_fraction: float = 0.0  # Share of active conversations pinned in cache (PRIORITY policy)
+    policy_code: int = field(init=False, repr=False, compare=False)  # Kernel code of eviction_policy
+
+    def __post_init__(self):
+        if not 0.0 <= self.pinned_fraction <= 1.0:
+            raise ValueError(f"pinned_fraction ({self.pinned_fraction}) must be between 0 and 1")
+        object.__setattr__(self, "policy_code", _EVICTION_POLICY_CODES[self.eviction_policy])
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ConversationPattern:
     """Conversation pattern parameters"""
     avg_conversation_length: float      # Average conversation length (rounds)
@@ -49,159 +123,550 @@ class ConversationPattern:
     within_conversation_interval: float # Average interval within a conversation (seconds)
     avg_sequence_length: int            # Average sequence length (tokens)
 
+class CacheBudget(NamedTuple):
+    """Split of the available memory between the model and KVCache"""
+    max_tokens: int                 # Maximum number of tokens that can be cached
+    model_overhead_gb: float        # Model memory including runtime overhead (GB)
+    available_for_cache_gb: float   # Memory left for KVCache (GB), negative if the model does not fit
+
+class BasicMetrics(NamedTuple):
+    """Conversation-level hit rate metrics (fields hold NumPy arrays for batch calculations)"""
+    hit_rate: float
+    avg_cached_conversations: float
+    cache_utilization: float
+    max_cached_tokens: int
+    active_conversations: float
+
+class DetailedMetrics(NamedTuple):
+    """Detailed performance metrics, BasicMetrics fields first (arrays for batch calculations)"""
+    hit_rate: float
+    avg_cached_conversations: float
+    cache_utilization: float
+    max_cached_tokens: int
+    active_conversations: float
+    memory_per_token_bytes: float
+    model_memory_gb: float
+    cache_memory_gb: float
+    derived_qps: float
+    tokens_per_second: float
+    cache_hits_per_second: float
+    memory_efficiency: float
+    bytes_per_token_fp16_baseline: float  # Memory per token if KVCache were stored in FP16
+    kv_compression_ratio: float           # FP16 baseline / actual memory per token
+    extra_tokens_vs_fp16: float           # Cached tokens gained over an FP16 KVCache (negative for FP32)
+    gqa_ratio: float                      # Query heads per KV head, 1 for MHA
+    memory_per_token_mha_equivalent: float  # Memory per token with one KV head per attention head
+    memory_saved_vs_mha_pct: float        # KVCache memory saved by GQA/MQA (%)
+
+@dataclass(frozen=True, slots=True, eq=False)  # ndarray fields: compare and hash by identity
+class ModelConfigArray:
+    """Model configuration parameters for a batch of models (one NumPy column per field)"""
+    num_layers: np.ndarray
+    num_attention_heads: np.ndarray
+    num_kv_heads: np.ndarray
+    head_dim: np.ndarray
+    kvcache_bytes: np.ndarray   # Bytes per KVCache element
+    model_size_gb: np.ndarray
+
+    @classmethod
+    def from_configs(cls, model_configs: Sequence[ModelConfig]) -> "ModelConfigArray":
+        """Build the column layout from a sequence of ModelConfig"""
+        return cls(
+            num_layers=np.array([m.num_layers for m in model_configs], dtype=np.float64),
+            num_attention_heads=np.array([m.num_attention_heads for m in model_configs], dtype=np.float64),
+            num_kv_heads=np.array([m.num_kv_heads for m in model_configs], dtype=np.float64),
+            head_dim=np.array([m.head_dim for m in model_configs], dtype=np.float64),
+            kvcache_bytes=np.array([m.bytes_per_element for m in model_configs], dtype=np.float64),
+            model_size_gb=np.array([m.model_size_gb for m in model_configs], dtype=np.float64),
+        )
+
+    def memory_per_token(self) -> np.ndarray:
+        """KVCache memory per token (bytes) for every model in the batch"""
+        return 2 * self.num_layers * self.num_kv_heads * self.head_dim * self.kvcache_bytes
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SystemConfigArray:
+    """System configuration parameters for a batch of systems (one eviction policy per batch)"""
+    available_memory_gb: np.ndarray
+    pinned_fraction: np.ndarray = 0.0
+    eviction_policy: EvictionPolicy = EvictionPolicy.LRU
+
+    @classmethod
+    def from_configs(cls, system_configs: Sequence[SystemConfig]) -> "SystemConfigArray":
+        """Build the column layout from a sequence of SystemConfig"""
+        eviction_policies = {s.eviction_policy for s in system_configs}
+        if len(eviction_policies) > 1:
+            raise ValueError("All system configs in a batch must use the same eviction policy")
+        return cls(
+            available_memory_gb=np.array([s.available_memory_gb for s in system_configs], dtype=np.float64),
+            pinned_fraction=np.array([s.pinned_fraction for s in system_configs], dtype=np.float64),
+            eviction_policy=eviction_policies.pop() if eviction_policies else EvictionPolicy.LRU,
+        )
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ConversationPatternArray:
+    """Conversation pattern parameters for a batch of patterns"""
+    avg_conversation_length: np.ndarray
+    conversation_arrival_rate: np.ndarray
+    within_conversation_interval: np.ndarray
+    avg_sequence_length: np.ndarray
+
+    @classmethod
+    def from_patterns(cls, conv_patterns: Sequence[ConversationPattern]) -> "ConversationPatternArray":
+        """Build the column layout from a sequence of ConversationPattern"""
+        return cls(
+            avg_conversation_length=np.array([c.avg_conversation_length for c in conv_patterns], dtype=np.float64),
+            conversation_arrival_rate=np.array([c.conversation_arrival_rate for c in conv_patterns], dtype=np.float64),
+            within_conversation_interval=np.array([c.within_conversation_interval for c in conv_patterns], dtype=np.float64),
+            avg_sequence_length=np.array([c.avg_sequence_length for c in conv_patterns], dtype=np.float64),
+        )
+
+def _max_cached_tokens(model_config: ModelConfig, system_config: SystemConfig) -> int:
+    # Available memory for KVCache = total memory - model memory (including runtime overhead)
+    available_for_cache_gb = system_config.available_memory_gb - model_config.model_overhead_gb
+    if available_for_cache_gb <= 0:
+        return 0
+    # Exact integer division in half-bytes, so 0.5-byte (4-bit) elements stay integral
+    return int(available_for_cache_gb * _GIB * 2) // int(model_config.memory_per_token * 2)
+
+def _cache_budget(model_config: ModelConfig, system_config: SystemConfig) -> CacheBudget:
+    return CacheBudget(_max_cached_tokens(model_config, system_config), model_config.model_overhead_gb,
+                       system_config.available_memory_gb - model_config.model_overhead_gb)
+
+def _batch_columns(model_configs: ModelConfigArray,
+                   system_configs: SystemConfigArray,
+                   conv_patterns: ConversationPatternArray) -> Tuple[np.ndarray, ...]:
+    """Broadcast all batch inputs to a common shape (kernel argument order)"""
+    return tuple(np.broadcast_arrays(*(np.asarray(column, dtype=np.float64) for column in (
+        model_configs.num_layers, model_configs.num_kv_heads, model_configs.head_dim,
+        model_configs.kvcache_bytes, model_configs.model_size_gb,
+        system_configs.available_memory_gb, system_configs.pinned_fraction,
+        conv_patterns.avg_conversation_length, conv_patterns.conversation_arrival_rate,
+        conv_patterns.within_conversation_interval, conv_patterns.avg_sequence_length,
+    ))))
+
+def _cache_ratio(policy_code, max_cached_conversations, active_conversations, pinned_fraction):
+    """Share of active conversations whose KVCache survives eviction (uncapped), per policy
+    
+    Closed-form approximations; works on scalars and on NumPy/CuPy arrays.
+    """
+    lru_ratio = max_cached_conversations / active_conversations
+    if policy_code == 1:
+        # W-TinyLFU: frequency-aware admission keeps hot conversations, sublinear fit
+        return lru_ratio ** 0.5
+    if policy_code == 2:
+        # Priority-based: pinned conversations are never evicted
+        return lru_ratio + pinned_fraction
+    return lru_ratio
+
+def _positive_part(x):
+    """max(x, 0) that works on scalars and on NumPy/CuPy arrays alike"""
+    return (x + abs(x)) * 0.5
+
+def _required_cache_ratio(policy_code, cache_ratio, pinned_fraction):
+    """Inverse of _cache_ratio: cached / active conversations needed for a given cache ratio
+    
+    Works on scalars and on NumPy/CuPy arrays.
+    """
+    if policy_code == 1:
+        return cache_ratio ** 2
+    if policy_code == 2:
+        return _positive_part(cache_ratio - pinned_fraction)
+    return cache_ratio
+
+# Explicit signatures compile the kernels eagerly at import, and cache=True keeps
+# the machine code on disk, so neither the first call nor later runs pay for the JIT
+_cache_ratio_jit = njit("float64(int64, float64, float64, float64)", cache=True)(_cache_ratio)
+
+def _recommend_memory(model_config: ModelConfig, system_config: SystemConfig,
+                      conv_pattern: ConversationPattern, reachable_hit_rates):
+    """Total memory (GB) needed to reach a hit rate, by closed-form inversion of the hit-rate model
+    
+    Works on a float or a NumPy array of hit rates, which callers clip to the
+    intra-conversation ceiling; targets already met are the callers' business too.
+    """
+    avg_tokens_per_conversation = conv_pattern.avg_conversation_length * conv_pattern.avg_sequence_length
+    conversation_lifetime = conv_pattern.avg_conversation_length * conv_pattern.within_conversation_interval
+    active_conversations = conv_pattern.conversation_arrival_rate * conversation_lifetime
+    
+    # hit_rate = intra_conversation_hit × cache_ratio(cached / active), so solve for cached directly.
+    intra_conversation_hit = 1.0 - (1.0 / conv_pattern.avg_conversation_length)
+    if intra_conversation_hit > 0:
+        required_cached_conversations = active_conversations * _required_cache_ratio(
+            system_config.policy_code,
+            reachable_hit_rates / intra_conversation_hit,
+            system_config.pinned_fraction)
+    else:
+        required_cached_conversations = reachable_hit_rates * 0.0
+    # The cache budget floors to whole tokens, so round up and add a byte for the GiB round trip.
+    # Without any KVCache nothing hits, even when pinning alone would cover the target
+    # (PRIORITY), so a positive target needs at least one token.
+    required_tokens = -(-(required_cached_conversations * avg_tokens_per_conversation) // 1)
+    required_tokens = 1.0 + _positive_part(required_tokens - 1.0)
+    required_cache_memory = (required_tokens * model_config.memory_per_token + 1) * _INV_GIB
+    
+    return required_cache_memory + model_config.model_overhead_gb
+
+def _get_array_module(use_gpu: bool):
+    """Return the array module for batch calculations: CuPy on GPU, NumPy otherwise"""
+    if not use_gpu:
+        return np
+    try:
+        import cupy
+    except ImportError as e:
+        raise ImportError("GPU batch calculations require CuPy, see https://docs.cupy.dev/en/stable/install.html") from e
+    return cupy
+
+def _hit_rate_array(xp, policy_code, num_layers, num_kv_heads, head_dim, kvcache_bytes, model_size_gb,
+                    available_memory_gb, pinned_fraction, conv_length, arrival_rate, interval, sequence_length):
+    """Vectorized hit-rate model on NumPy or CuPy arrays, same formulas as calculate_conversation_hit_rate"""
+    memory_per_token = 2 * num_layers * num_kv_heads * head_dim * kvcache_bytes
+    available_for_cache = (available_memory_gb - model_size_gb * MODEL_OVERHEAD_FACTOR) * _GIB
+    # Exact integer division in half-bytes, as in the scalar path
+    max_cached_tokens = ((xp.maximum(available_for_cache, 0) * 2).astype(xp.int64) //
+                         (memory_per_token * 2).astype(xp.int64))
+    has_cache = max_cached_tokens > 0
+    
+    avg_tokens_per_conversation = conv_length * sequence_length
+    max_cached_conversations = max_cached_tokens / avg_tokens_per_conversation
+    active_conversations = xp.where(has_cache, arrival_rate * conv_length * interval, 0.0)
+    
+    intra_conversation_hit = 1.0 - 1.0 / conv_length
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cache_ratio = _cache_ratio(policy_code, max_cached_conversations, active_conversations, pinned_fraction)
+        hit_rate = intra_conversation_hit * xp.minimum(1.0, cache_ratio)
+        cache_utilization = xp.where(max_cached_conversations > 0,
+                                     xp.minimum(active_conversations / max_cached_conversations, 1.0),
+                                     0.0)
+    
+    return BasicMetrics(
+        hit_rate=xp.where(has_cache, xp.clip(hit_rate, 0.0, 1.0), 0.0),
+        avg_cached_conversations=xp.minimum(active_conversations, max_cached_conversations),
+        cache_utilization=xp.where(has_cache, cache_utilization, 0.0),
+        max_cached_tokens=max_cached_tokens,
+        active_conversations=active_conversations
+    )
+
+@njit("UniTuple(float64, 4)(int64, int64, float64, float64, float64, float64, float64)",
+      cache=True, fastmath=True)
+def _hit_rate_point(policy_code, max_cached_tokens, pinned_fraction,
+                    conv_length, arrival_rate, interval, sequence_length):
+    """Hit-rate model for one point on plain scalars
+    
+    Returns (hit_rate, avg_cached_conversations, cache_utilization, active_conversations).
+    """
+    if max_cached_tokens <= 0:
+        return 0.0, 0.0, 0.0, 0.0
+    
+    # Number of conversations that can be cached
+    max_cached_conversations = max_cached_tokens / (conv_length * sequence_length)
+    
+    # Using Little's Law: average number of conversations in the system = arrival rate × average stay time
+    active_conversations = arrival_rate * conv_length * interval
+    
+    # Cache hit rate modeling (based on the eviction policy, LRU by default):
+    # hit rate within conversations (first request cannot hit) × share of conversations kept in cache
+    intra_conversation_hit = 1.0 - 1.0 / conv_length
+    cache_ratio = 1.0
+    if active_conversations > max_cached_conversations:
+        cache_ratio = min(1.0, _cache_ratio_jit(policy_code, max_cached_conversations,
+                                                active_conversations, pinned_fraction))
+    hit_rate = intra_conversation_hit * cache_ratio
+    
+    return (max(0.0, min(1.0, hit_rate)),
+            min(active_conversations, max_cached_conversations),
+            min(active_conversations / max_cached_conversations, 1.0),
+            active_conversations)
+
+@njit("void(int64, " + "float64[::1], " * 11 +
+      "float64[::1], float64[::1], int64[::1], float64[::1], float64[::1])",
+      parallel=True, cache=True, fastmath=True)
+def _hit_rate_kernel(policy_code, num_layers, num_kv_heads, head_dim, kvcache_bytes, model_size_gb,
+                     available_memory_gb, pinned_fraction, conv_length, arrival_rate, interval, sequence_length,
+                     out_hit_rate, out_cache_utilization, out_max_cached_tokens,
+                     out_avg_cached_conversations, out_active_conversations):
+    """Numba kernel of the hit-rate model, one sweep point per iteration"""
+    for i in prange(out_hit_rate.shape[0]):
+        memory_per_token = 2.0 * num_layers[i] * num_kv_heads[i] * head_dim[i] * kvcache_bytes[i]
+        available_for_cache = (available_memory_gb[i] - model_size_gb[i] * MODEL_OVERHEAD_FACTOR) * _GIB
+        max_cached_tokens = 0
+        if available_for_cache > 0:
+            max_cached_tokens = int(available_for_cache * 2) // int(memory_per_token * 2)
+        out_max_cached_tokens[i] = max_cached_tokens
+        
+        (out_hit_rate[i], out_avg_cached_conversations[i], out_cache_utilization[i],
+         out_active_conversations[i]) = _hit_rate_point(policy_code, max_cached_tokens, pinned_fraction[i],
+                                                        conv_length[i], arrival_rate[i], interval[i],
+                                                        sequence_length[i])
+
+def _conversation_hit_rate(system_config: SystemConfig, conv_pattern: ConversationPattern,
+                           max_cached_tokens: int) -> BasicMetrics:
+    """Conversation-level hit rate for an already computed cache size"""
+    hit_rate, avg_cached_conversations, cache_utilization, active_conversations = _hit_rate_point(
+        system_config.policy_code, max_cached_tokens,
+        system_config.pinned_fraction, conv_pattern.avg_conversation_length,
+        conv_pattern.conversation_arrival_rate, conv_pattern.within_conversation_interval,
+        conv_pattern.avg_sequence_length
+    )
+    # Positional construction: keyword arguments cost about twice as much per call
+    return BasicMetrics(hit_rate, avg_cached_conversations, cache_utilization, max_cached_tokens,
+                        active_conversations)
+
+def _empty_basic_metrics(shape) -> BasicMetrics:
+    """Allocate uninitialized batch output arrays"""
+    return BasicMetrics(
+        hit_rate=np.empty(shape),
+        avg_cached_conversations=np.empty(shape),
+        cache_utilization=np.empty(shape),
+        max_cached_tokens=np.empty(shape, dtype=np.int64),
+        active_conversations=np.empty(shape)
+    )
+
+def _conversation_hit_rate_batch(columns: Tuple[np.ndarray, ...], eviction_policy: EvictionPolicy,
+                                 xp=np, out: Optional[BasicMetrics] = None) -> BasicMetrics:
+    """Dispatch the batch hit-rate model to CuPy or Numba when available, NumPy otherwise
+    
+    Only the Numba kernel writes into out directly; the array paths return new arrays.
+    """
+    policy_code = _EVICTION_POLICY_CODES[eviction_policy]
+    if xp is not np or not HAS_NUMBA:
+        return _hit_rate_array(xp, policy_code, *columns)
+    
+    flat_columns = [np.ascontiguousarray(column).ravel() for column in columns]
+    metrics = out if out is not None else _empty_basic_metrics(columns[0].shape)
+    # C-contiguous outputs, so the flat views share memory with the returned arrays
+    flat_metrics = BasicMetrics(*(values.reshape(-1) for values in metrics))
+    _hit_rate_kernel(policy_code, *flat_columns,
+                     flat_metrics.hit_rate, flat_metrics.cache_utilization, flat_metrics.max_cached_tokens,
+                     flat_metrics.avg_cached_conversations, flat_metrics.active_conversations)
+    return metrics
+
 class KVCacheCalculator:
-    """KVCache Hit Rate Calculator"""
-    
-    def __init__(self):
-        self.dtype_bytes = {
-            ModelDtype.FP32: 4,
-            ModelDtype.FP16: 2,
-            ModelDtype.BF16: 2,
-            ModelDtype.FP8: 1,
-            ModelDtype.INT8: 1,
-            ModelDtype.INT4: 0.5,
-            KVCacheDtype.FP32: 4,
-            KVCacheDtype.FP16: 2,
-            KVCacheDtype.BF16: 2,
-            KVCacheDtype.FP8: 1,
-            KVCacheDtype.INT8: 1,
-        }
+    """KVCache Hit Rate Calculator
     
-    def calculate_kvcache_memory_per_token(self, model_config: ModelConfig) -> int:
+    Stateless: every method is a static method, the class only groups the API.
+    """
+    
+    dtype_bytes = _DTYPE_BYTES
+    
+    @staticmethod
+    def calculate_kvcache_memory_per_token(model_config: ModelConfig) -> float:
         """Calculate the memory occupied by each token in KVCache (bytes)"""
-        # KVCache contains Key and Value, each layer has
-        # Memory = 2 (K+V) * num_layers * num_kv_heads * head_dim * dtype_bytes
-        bytes_per_element = self.dtype_bytes[model_config.kvcache_dtype]
-        memory_per_token = (2 * model_config.num_layers * 
-                           model_config.num_kv_heads * 
-                           model_config.head_dim * 
-                           bytes_per_element)
-        return memory_per_token
-    
-    def calculate_derived_qps(self, conv_pattern: ConversationPattern) -> float:
+        return model_config.memory_per_token
+    
+    @staticmethod
+    def calculate_kvcache_memory_per_token_all_dtypes(model_config: ModelConfig) -> np.ndarray:
+        """Calculate the memory per token (bytes) for every KVCache data type at once
+        
+        Entries follow KVCacheDtype declaration order, e.g. dict(zip(KVCacheDtype, result));
+        the kvcache_dtype of model_config is ignored.
+        """
+        return 2 * model_config.num_layers * model_config.num_kv_heads * model_config.head_dim * _KV_DTYPE_BYTES
+    
+    @staticmethod
+    def calculate_derived_qps(conv_pattern: ConversationPattern) -> float:
         """Derive QPS from conversation parameters"""
         # QPS = number of requests per second, independent of token length
         # Based on Little's Law:
         # System QPS = conversation arrival rate × average conversation length (number of requests per conversation)
         return conv_pattern.conversation_arrival_rate * conv_pattern.avg_conversation_length
     
-    def calculate_max_cached_tokens(self, model_config: ModelConfig, 
+    @staticmethod
+    def calculate_max_cached_tokens(model_config: ModelConfig, 
                                    system_config: SystemConfig) -> int:
         """Calculate the maximum number of tokens that can be cached"""
-        memory_per_token = self.calculate_kvcache_memory_per_token(model_config)
-        
-        # Available memory for KVCache = total memory - model memory - system overhead
-        available_for_cache = (system_config.available_memory_gb * 1024**3 - 
-                              model_config.model_size_gb * 1024**3 * 1.2)  # 1.2x model memory overhead
-        
-        if available_for_cache <= 0:
-            return 0
-            
-        max_tokens = int(available_for_cache / memory_per_token)
-        return max_tokens
+        return _max_cached_tokens(model_config, system_config)
     
-    def calculate_conversation_hit_rate(self, model_config: ModelConfig,
+    @staticmethod
+    def calculate_cache_budget(model_config: ModelConfig,
+                              system_config: SystemConfig) -> CacheBudget:
+        """Calculate how the available memory splits between the model and KVCache"""
+        return _cache_budget(model_config, system_config)
+    
+    @staticmethod
+    def calculate_conversation_hit_rate(model_config: ModelConfig,
                                       system_config: SystemConfig,
-                                      conv_pattern: ConversationPattern) -> Dict[str, float]:
+                                      conv_pattern: ConversationPattern) -> BasicMetrics:
         """Calculate the hit rate at the conversation level"""
+        return _conversation_hit_rate(system_config, conv_pattern, _max_cached_tokens(model_config, system_config))
+    
+    @staticmethod
+    def calculate_detailed_metrics(model_config: ModelConfig,
+                                 system_config: SystemConfig,
+                                 conv_pattern: ConversationPattern) -> DetailedMetrics:
+        """Calculate detailed performance metrics"""
         
-        max_cached_tokens = self.calculate_max_cached_tokens(model_config, system_config)
-        
-        if max_cached_tokens <= 0:
-            return {"hit_rate": 0.0, "avg_cached_conversations": 0.0, "cache_utilization": 0.0, 
-                   "max_cached_tokens": 0, "active_conversations": 0}
+        basic_metrics = _conversation_hit_rate(system_config, conv_pattern,
+                                               _max_cached_tokens(model_config, system_config))
         
-        # Estimate the average number of tokens per conversation
-        avg_tokens_per_conversation = conv_pattern.avg_conversation_length * conv_pattern.avg_sequence_length
+        # Calculate memory usage details
+        memory_per_token = model_config.memory_per_token
+        model_memory_gb = model_config.model_overhead_gb
         
-        # Number of conversations that can be cached
-        max_cached_conversations = max_cached_tokens / avg_tokens_per_conversation
+        # Calculate performance improvement - QPS derived from conversation parameters
+        derived_qps = KVCacheCalculator.calculate_derived_qps(conv_pattern)
+        tokens_per_second = derived_qps * conv_pattern.avg_sequence_length
+        cache_hits_per_second = tokens_per_second * basic_metrics.hit_rate
         
-        # Conversation arrival rate and survival time modeling
-        conversation_lifetime = conv_pattern.avg_conversation_length * conv_pattern.within_conversation_interval
+        # KVCache quantization gains relative to FP16
+        fp16_memory_per_token = memory_per_token * KVCacheDtype.FP16.bytes_per_element / model_config.bytes_per_element
         
-        # Using Little's Law: average number of conversations in the system = arrival rate × average stay time
-        active_conversations = conv_pattern.conversation_arrival_rate * conversation_lifetime
+        # Positional construction in field order: keyword arguments cost about twice as much per call
+        return DetailedMetrics(
+            *basic_metrics,
+            memory_per_token,                                                   # memory_per_token_bytes
+            model_memory_gb,
+            basic_metrics.max_cached_tokens * memory_per_token * _INV_GIB,      # cache_memory_gb
+            derived_qps,
+            tokens_per_second,
+            cache_hits_per_second,
+            basic_metrics.cache_utilization,                                    # memory_efficiency
+            fp16_memory_per_token,                                              # bytes_per_token_fp16_baseline
+            fp16_memory_per_token / memory_per_token,                           # kv_compression_ratio
+            basic_metrics.max_cached_tokens * (1.0 - memory_per_token / fp16_memory_per_token),  # extra_tokens_vs_fp16
+            model_config.gqa_ratio,
+            memory_per_token * model_config.gqa_ratio,                          # memory_per_token_mha_equivalent
+            (1.0 - 1.0 / model_config.gqa_ratio) * 100                          # memory_saved_vs_mha_pct
+        )
+
+    @staticmethod
+    def calculate_conversation_hit_rate_batch(model_configs: ModelConfigArray,
+                                            system_configs: SystemConfigArray,
+                                            conv_patterns: ConversationPatternArray,
+                                            use_gpu: bool = False,
+                                            out: Optional[BasicMetrics] = None) -> BasicMetrics:
+        """Calculate the conversation-level hit rate for a whole parameter sweep at once
         
-        # Cache hit rate modeling (based on LRU strategy)
-        if active_conversations <= max_cached_conversations:
-            # All active conversations can be cached
-            hit_rate = 1.0 - (1.0 / conv_pattern.avg_conversation_length)  # First request cannot hit
-        else:
-            # Some conversations are cached, using probability model
-            cache_ratio = max_cached_conversations / active_conversations
-            # Consider the hit rate within conversations and the competition between conversations
-            intra_conversation_hit = 1.0 - (1.0 / conv_pattern.avg_conversation_length)
-            inter_conversation_hit = cache_ratio
-            hit_rate = intra_conversation_hit * inter_conversation_hit
+        Runs the parallel Numba kernel when Numba is installed, NumPy otherwise.
+        With use_gpu the sweep runs on CuPy instead, which only pays off from
+        roughly 10^5 points; results are always returned as NumPy arrays.
         
-        cache_utilization = min(active_conversations / max_cached_conversations, 1.0) if max_cached_conversations > 0 else 0
+        Repeated sweeps of the same shape can pass out (see empty_hit_rate_batch)
+        to reuse the output arrays; they are filled in place and returned.
+        """
+        xp = _get_array_module(use_gpu)
+        columns = tuple(xp.asarray(column) for column in _batch_columns(model_configs, system_configs, conv_patterns))
+        if out is not None and not all(values.shape == columns[0].shape and values.flags.c_contiguous and
+                                       values.dtype == expected.dtype
+                                       for values, expected in zip(out, _empty_basic_metrics(0))):
+            raise ValueError(f"out arrays must match empty_hit_rate_batch({columns[0].shape})")
         
-        return {
-            "hit_rate": max(0.0, min(1.0, hit_rate)),
-            "avg_cached_conversations": min(active_conversations, max_cached_conversations),
-            "cache_utilization": cache_utilization,
-            "max_cached_tokens": max_cached_tokens,
-            "active_conversations": active_conversations
-        }
+        metrics = _conversation_hit_rate_batch(columns, system_configs.eviction_policy, xp,
+                                               out=None if use_gpu else out)
+        if use_gpu:
+            metrics = BasicMetrics(*(values.get() for values in metrics))
+        if out is not None and metrics is not out:
+            for target, values in zip(out, metrics):
+                target[...] = values
+            metrics = out
+        return metrics
     
-    def calculate_detailed_metrics(self, model_config: ModelConfig,
-                                 system_config: SystemConfig,
-                                 conv_pattern: ConversationPattern) -> Dict[str, float]:
-        """Calculate detailed performance metrics"""
+    @staticmethod
+    def empty_hit_rate_batch(shape) -> BasicMetrics:
+        """Allocate output arrays for calculate_conversation_hit_rate_batch(out=...)"""
+        return _empty_basic_metrics(shape)
+
+    @staticmethod
+    def calculate_detailed_metrics_batch(model_configs: ModelConfigArray,
+                                       system_configs: SystemConfigArray,
+                                       conv_patterns: ConversationPatternArray,
+                                       use_gpu: bool = False) -> DetailedMetrics:
+        """Calculate detailed performance metrics for a whole parameter sweep at once
         
-        basic_metrics = self.calculate_conversation_hit_rate(model_config, system_config, conv_pattern)
+        Columns are broadcast against each other, so a grid can be evaluated by
+        giving the inputs orthogonal shapes (e.g. memory as (K, 1), patterns as (1, M)).
+        See calculate_conversation_hit_rate_batch for use_gpu.
+        """
+        xp = _get_array_module(use_gpu)
+        columns = tuple(xp.asarray(column) for column in _batch_columns(model_configs, system_configs, conv_patterns))
+        (num_layers, num_kv_heads, head_dim, kvcache_bytes, model_size_gb,
+         _, _, conv_length, arrival_rate, _, sequence_length) = columns
         
-        # Calculate memory usage details
-        memory_per_token = self.calculate_kvcache_memory_per_token(model_config)
-        model_memory_gb = model_config.model_size_gb * 1.2  # Includes runtime overhead
+        basic_metrics = _conversation_hit_rate_batch(columns, system_configs.eviction_policy, xp)
         
-        # Calculate performance improvement - QPS derived from conversation parameters
-        derived_qps = self.calculate_derived_qps(conv_pattern)
-        tokens_per_second = derived_qps * conv_pattern.avg_sequence_length
-        cache_hits_per_second = tokens_per_second * basic_metrics["hit_rate"]
+        memory_per_token = 2 * num_layers * num_kv_heads * head_dim * kvcache_bytes
+        fp16_memory_per_token = 2 * num_layers * num_kv_heads * head_dim * KVCacheDtype.FP16.bytes_per_element
+        gqa_ratio = xp.asarray(model_configs.num_attention_heads, dtype=xp.float64) / num_kv_heads
+        derived_qps = arrival_rate * conv_length
+        tokens_per_second = derived_qps * sequence_length
         
-        return {
-            **basic_metrics,
-            "memory_per_token_bytes": memory_per_token,
-            "model_memory_gb": model_memory_gb,
-            "cache_memory_gb": (basic_metrics["max_cached_tokens"] * memory_per_token) / (1024**3),
-            "derived_qps": derived_qps,
-            "tokens_per_second": tokens_per_second,
-            "cache_hits_per_second": cache_hits_per_second,
-            "memory_efficiency": basic_metrics["cache_utilization"]
-        }
+        metrics = DetailedMetrics(
+            *basic_metrics,
+            memory_per_token_bytes=memory_per_token,
+            model_memory_gb=model_size_gb * MODEL_OVERHEAD_FACTOR,
+            cache_memory_gb=basic_metrics.max_cached_tokens * memory_per_token * _INV_GIB,
+            derived_qps=derived_qps,
+            tokens_per_second=tokens_per_second,
+            cache_hits_per_second=tokens_per_second * basic_metrics.hit_rate,
+            memory_efficiency=basic_metrics.cache_utilization,
+            bytes_per_token_fp16_baseline=fp16_memory_per_token,
+            kv_compression_ratio=fp16_memory_per_token / memory_per_token,
+            extra_tokens_vs_fp16=basic_metrics.max_cached_tokens * (1.0 - memory_per_token / fp16_memory_per_token),
+            gqa_ratio=gqa_ratio,
+            memory_per_token_mha_equivalent=memory_per_token * gqa_ratio,
+            memory_saved_vs_mha_pct=(1.0 - 1.0 / gqa_ratio) * 100
+        )
+        if use_gpu:
+            metrics = DetailedMetrics(*(values.get() for values in metrics))
+        return metrics
 
-    def optimize_memory_allocation(self, model_config: ModelConfig,
+    @staticmethod
+    def optimize_memory_allocation(model_config: ModelConfig,
                                  system_config: SystemConfig,
                                  conv_pattern: ConversationPattern,
                                  target_hit_rate: float = 0.8) -> Dict[str, float]:
         """Optimize memory allocation to achieve target hit rate"""
         
-        current_metrics = self.calculate_detailed_metrics(model_config, system_config, conv_pattern)
+        current_hit_rate = _conversation_hit_rate(system_config, conv_pattern,
+                                                  _max_cached_tokens(model_config, system_config)).hit_rate
+        # The first request of a conversation never hits, which caps the reachable hit rate
+        intra_conversation_hit = 1.0 - (1.0 / conv_pattern.avg_conversation_length)
         
-        if current_metrics["hit_rate"] >= target_hit_rate:
-            return {"recommended_memory_gb": system_config.available_memory_gb,
-                   "current_hit_rate": current_metrics["hit_rate"],
-                   "achievable": True}
+        met = current_hit_rate >= target_hit_rate
+        if met:
+            required_total_memory = system_config.available_memory_gb
+        else:
+            # Estimate the memory required to achieve the target hit rate
+            required_total_memory = _recommend_memory(model_config, system_config, conv_pattern,
+                                                      min(target_hit_rate, intra_conversation_hit))
         
-        # Estimate the memory required to achieve the target hit rate
-        memory_per_token = self.calculate_kvcache_memory_per_token(model_config)
-        avg_tokens_per_conversation = conv_pattern.avg_conversation_length * conv_pattern.avg_sequence_length
-        conversation_lifetime = conv_pattern.avg_conversation_length * conv_pattern.within_conversation_interval
-        active_conversations = conv_pattern.conversation_arrival_rate * conversation_lifetime
+        return {
+            "recommended_memory_gb": required_total_memory,
+            "current_hit_rate": current_hit_rate,
+            "target_hit_rate": target_hit_rate,
+            "max_achievable_hit_rate": intra_conversation_hit,
+            "additional_memory_needed_gb": max(0, required_total_memory - system_config.available_memory_gb),
+            "achievable": met or (target_hit_rate <= intra_conversation_hit and
+                                  required_total_memory <= system_config.available_memory_gb * 2)  # Assume at most 2x current memory
+        }
+    
+    @staticmethod
+    def optimize_memory_allocation_batch(model_config: ModelConfig,
+                                         system_config: SystemConfig,
+                                         conv_pattern: ConversationPattern,
+                                         target_hit_rates: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Optimize memory allocation for several target hit rates at once
         
-        # To achieve the target hit rate, more conversations need to be cached
-        required_cached_conversations = active_conversations * target_hit_rate
-        required_tokens = required_cached_conversations * avg_tokens_per_conversation
-        required_cache_memory = required_tokens * memory_per_token / (1024**3)
+        Same fields as optimize_memory_allocation, each an array over target_hit_rates;
+        targets already met keep the current memory.
+        """
+        target_hit_rates = np.asarray(target_hit_rates, dtype=np.float64)
+        current_hit_rate = _conversation_hit_rate(system_config, conv_pattern,
+                                                  _max_cached_tokens(model_config, system_config)).hit_rate
+        intra_conversation_hit = 1.0 - (1.0 / conv_pattern.avg_conversation_length)
         
-        required_total_memory = required_cache_memory + model_config.model_size_gb * 1.2
+        met = current_hit_rate >= target_hit_rates
+        required_total_memory = np.where(
+            met, system_config.available_memory_gb,
+            _recommend_memory(model_config, system_config, conv_pattern,
+                              np.minimum(target_hit_rates, intra_conversation_hit)))
         
         return {
             "recommended_memory_gb": required_total_memory,
-            "current_hit_rate": current_metrics["hit_rate"],
-            "target_hit_rate": target_hit_rate,
-            "additional_memory_needed_gb": max(0, required_total_memory - system_config.available_memory_gb),
-            "achievable": required_total_memory <= system_config.available_memory_gb * 2  # Assume at most 2x current memory
-        } 
\ No newline at end of file
+            "current_hit_rate": np.full_like(target_hit_rates, current_hit_rate),
+            "target_hit_rate": target_hit_rates,
+            "max_achievable_hit_rate": np.full_like(target_hit_rates, intra_conversation_hit),
+            "additional_memory_needed_gb": np.maximum(0.0, required_total_memory - system_config.available_memory_gb),
+            "achievable": met | ((target_hit_rates <= intra_conversation_hit) &
+                                 (required_total_memory <= system_config.available_memory_gb * 2))
+        }
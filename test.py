@@ -3,13 +3,27 @@
 KVCache Calculator Full Test Suite
 """
 
-from kvcache_calculator import *
+import os
+from dataclasses import replace
+
+import numpy as np
+
+from kvcache_calculator import (
+    KVCacheCalculator, ModelConfig, SystemConfig, ConversationPattern,
+    ModelDtype, KVCacheDtype, EvictionPolicy,
+    ModelConfigArray, SystemConfigArray, ConversationPatternArray
+)
+
+# The calculator is stateless, so one instance is shared by every test
+CALC = KVCacheCalculator()
+
+# Per-check output only when KV_TEST_VERBOSE is set, so benchmark runs skip the IO
+_VERBOSE = bool(os.getenv("KV_TEST_VERBOSE"))
+_log = print if _VERBOSE else (lambda *args, **kwargs: None)
 
 def test_basic_functionality():
     """Test basic functionality"""
-    print("🧪 Test basic functionality...")
-    
-    calculator = KVCacheCalculator()
+    _log("🧪 Test basic functionality...")
     
     # Test configuration - using Mistral-24B configuration
     model_config = ModelConfig(
@@ -34,47 +48,60 @@ def test_basic_functionality():
     )
     
     # Test memory calculation
-    memory_per_token = calculator.calculate_kvcache_memory_per_token(model_config)
+    memory_per_token = CALC.calculate_kvcache_memory_per_token(model_config)
     assert memory_per_token > 0, "Memory per token should be greater than 0"
-    print(f"  ✅ Memory per token calculation: {memory_per_token} bytes")
+    _log(f"  ✅ Memory per token calculation: {memory_per_token:,.0f} bytes")
     
     # Test QPS calculation
-    derived_qps = calculator.calculate_derived_qps(conv_pattern)
+    derived_qps = CALC.calculate_derived_qps(conv_pattern)
     expected_qps = conv_pattern.conversation_arrival_rate * conv_pattern.avg_conversation_length
     assert abs(derived_qps - expected_qps) < 0.01, "QPS calculation error"
-    print(f"  ✅ QPS calculation: {derived_qps:.1f} req/s")
+    _log(f"  ✅ QPS calculation: {derived_qps:.1f} req/s")
+    
+    # Detailed metrics include the basic ones, so one call covers both
+    detailed_metrics = CALC.calculate_detailed_metrics(model_config, system_config, conv_pattern)
+    required_fields = {'hit_rate', 'cache_utilization', 'max_cached_tokens', 'derived_qps', 'tokens_per_second',
+                       'cache_hits_per_second', 'memory_per_token_bytes', 'cache_memory_gb'}
+    missing_fields = required_fields.difference(detailed_metrics._fields)
+    assert not missing_fields, f"Missing fields: {missing_fields}"
+    _log(f"  ✅ Detailed metrics calculation complete")
     
     # Test maximum cached tokens
-    max_tokens = calculator.calculate_max_cached_tokens(model_config, system_config)
+    max_tokens = detailed_metrics.max_cached_tokens
     assert max_tokens > 0, "Max cached tokens should be greater than 0"
-    print(f"  ✅ Max cached tokens: {max_tokens:,}")
+    _log(f"  ✅ Max cached tokens: {max_tokens:,}")
+    
+    # Test cache budget
+    budget = CALC.calculate_cache_budget(model_config, system_config)
+    assert budget.max_tokens == max_tokens, "Cache budget should agree with max cached tokens"
+    assert abs(budget.model_overhead_gb + budget.available_for_cache_gb - system_config.available_memory_gb) < 1e-9, \
+        "Model and cache memory should add up to the available memory"
+    available_bytes = int(budget.available_for_cache_gb * 1024**3)
+    assert max_tokens * memory_per_token <= available_bytes < (max_tokens + 1) * memory_per_token, \
+        "Max cached tokens should be the exact floor of cache memory / memory per token"
+    _log(f"  ✅ Cache budget: {budget.available_for_cache_gb:.1f} GB for KVCache")
     
     # Test hit rate calculation
-    hit_rate_metrics = calculator.calculate_conversation_hit_rate(model_config, system_config, conv_pattern)
-    assert 0 <= hit_rate_metrics['hit_rate'] <= 1, "Hit rate should be between 0 and 1"
-    assert 0 <= hit_rate_metrics['cache_utilization'] <= 1, "Cache utilization should be between 0 and 1"
-    print(f"  ✅ Hit rate calculation: {hit_rate_metrics['hit_rate']:.1%}")
-    print(f"  ✅ Cache utilization: {hit_rate_metrics['cache_utilization']:.1%}")
-    
-    # Test detailed metrics calculation
-    detailed_metrics = calculator.calculate_detailed_metrics(model_config, system_config, conv_pattern)
-    required_fields = ['hit_rate', 'cache_utilization', 'derived_qps', 'tokens_per_second', 
-                      'cache_hits_per_second', 'memory_per_token_bytes', 'cache_memory_gb']
-    for field in required_fields:
-        assert field in detailed_metrics, f"Missing field: {field}"
-    print(f"  ✅ Detailed metrics calculation complete")
+    ratios = np.array([detailed_metrics.hit_rate, detailed_metrics.cache_utilization])
+    assert np.all((ratios >= 0) & (ratios <= 1)), "Hit rate and cache utilization should be between 0 and 1"
+    _log(f"  ✅ Hit rate calculation: {detailed_metrics.hit_rate:.1%}")
+    _log(f"  ✅ Cache utilization: {detailed_metrics.cache_utilization:.1%}")
+    
+    # Test GQA savings - Mistral-24B shares each KV head across 4 query heads
+    assert detailed_metrics.gqa_ratio == 4, "GQA ratio should be 32 / 8"
+    assert detailed_metrics.memory_per_token_mha_equivalent == memory_per_token * 4, "MHA equivalent should be 4x"
+    assert abs(detailed_metrics.memory_saved_vs_mha_pct - 75.0) < 1e-9, "GQA should save 75% vs MHA"
+    _log(f"  ✅ GQA saves {detailed_metrics.memory_saved_vs_mha_pct:.0f}% KVCache memory vs MHA")
     
     # Test optimization suggestions
-    optimization = calculator.optimize_memory_allocation(model_config, system_config, conv_pattern)
-    assert 'recommended_memory_gb' in optimization, "Should contain memory recommendation"
-    assert 'achievable' in optimization, "Should contain achievability judgment"
-    print(f"  ✅ Optimization suggestions generated successfully")
+    optimization = CALC.optimize_memory_allocation(model_config, system_config, conv_pattern)
+    missing_keys = {'recommended_memory_gb', 'achievable'} - optimization.keys()
+    assert not missing_keys, f"Optimization result missing: {missing_keys}"
+    _log(f"  ✅ Optimization suggestions generated successfully")
 
 def test_edge_cases():
     """Test edge cases"""
-    print("🧪 Test edge cases...")
-    
-    calculator = KVCacheCalculator()
+    _log("🧪 Test edge cases...")
     
     # Test memory shortage - using Qwen3-32B configuration but memory shortage
     large_model_config = ModelConfig(
@@ -98,11 +125,26 @@ def test_edge_cases():
         avg_sequence_length=100
     )
     
-    max_tokens = calculator.calculate_max_cached_tokens(large_model_config, limited_system_config)
-    print(f"  ✅ Memory shortage handling: {max_tokens}")
+    # Test invalid GQA grouping
+    try:
+        ModelConfig(40, 32, 7, 128, ModelDtype.FP16, KVCacheDtype.FP16, 48.0)
+    except ValueError:
+        _log("  ✅ Invalid KV head grouping rejected")
+    else:
+        raise AssertionError("num_attention_heads not divisible by num_kv_heads should be rejected")
     
-    metrics = calculator.calculate_conversation_hit_rate(large_model_config, limited_system_config, conv_pattern)
-    print(f"  ✅ Hit rate when memory shortage: {metrics['hit_rate']:.1%}")
+    try:
+        ModelConfig(40, 0, 8, 128, ModelDtype.FP16, KVCacheDtype.FP16, 48.0)
+    except ValueError:
+        _log("  ✅ Zero attention heads rejected")
+    else:
+        raise AssertionError("num_attention_heads <= 0 should be rejected")
+    
+    max_tokens = CALC.calculate_max_cached_tokens(large_model_config, limited_system_config)
+    _log(f"  ✅ Memory shortage handling: {max_tokens}")
+    
+    metrics = CALC.calculate_conversation_hit_rate(large_model_config, limited_system_config, conv_pattern)
+    _log(f"  ✅ Hit rate when memory shortage: {metrics.hit_rate:.1%}")
     
     # Test extreme high load
     high_load_pattern = ConversationPattern(
@@ -112,16 +154,25 @@ def test_edge_cases():
         avg_sequence_length=2000
     )
     
-    high_load_metrics = calculator.calculate_conversation_hit_rate(
+    high_load_metrics = CALC.calculate_conversation_hit_rate(
         large_model_config, limited_system_config, high_load_pattern
     )
-    print(f"  ✅ High load handling: {high_load_metrics['hit_rate']:.1%}")
+    _log(f"  ✅ High load handling: {high_load_metrics.hit_rate:.1%}")
+    
+    # Both edge patterns in one batch call
+    edge_metrics = CALC.calculate_conversation_hit_rate_batch(
+        ModelConfigArray.from_configs([large_model_config]),
+        SystemConfigArray.from_configs([limited_system_config]),
+        ConversationPatternArray.from_patterns([conv_pattern, high_load_pattern])
+    )
+    assert np.all((edge_metrics.hit_rate >= 0) & (edge_metrics.hit_rate <= 1)), "Edge hit rates out of range"
+    assert np.allclose(edge_metrics.hit_rate, [metrics.hit_rate, high_load_metrics.hit_rate]), \
+        "Edge batch should match the scalar path"
+    _log(f"  ✅ Edge patterns batch matches scalar for {edge_metrics.hit_rate.size} patterns")
 
 def test_different_dtypes():
     """Test different data types"""
-    print("🧪 Test different data types...")
-    
-    calculator = KVCacheCalculator()
+    _log("🧪 Test different data types...")
     
     base_config = ModelConfig(
         num_layers=32,
@@ -133,33 +184,57 @@ def test_different_dtypes():
         model_size_gb=16.0
     )
     
-    # 测试剩余的数据类型（移除FP8）
     dtypes_to_test = [
         KVCacheDtype.FP32,
         KVCacheDtype.FP16,
         KVCacheDtype.BF16,
+        KVCacheDtype.FP8,
         KVCacheDtype.INT8,
     ]
     
-    for dtype in dtypes_to_test:
-        config = ModelConfig(
-            num_layers=base_config.num_layers,
-            num_attention_heads=base_config.num_attention_heads,
-            num_kv_heads=base_config.num_kv_heads,
-            head_dim=base_config.head_dim,
-            model_dtype=base_config.model_dtype,
-            kvcache_dtype=dtype,
-            model_size_gb=base_config.model_size_gb
-        )
-        
-        memory_per_token = calculator.calculate_kvcache_memory_per_token(config)
-        print(f"  ✅ {dtype.value}: {memory_per_token:,} bytes/token")
+    # One array operation for every dtype, indexed in KVCacheDtype declaration order
+    all_dtype_memory = CALC.calculate_kvcache_memory_per_token_all_dtypes(base_config)
+    dtype_index = np.array([list(KVCacheDtype).index(dtype) for dtype in dtypes_to_test])
+    dtype_memory = all_dtype_memory[dtype_index]
+    assert all_dtype_memory[list(KVCacheDtype).index(base_config.kvcache_dtype)] == \
+        CALC.calculate_kvcache_memory_per_token(base_config), "All-dtype memory mismatch for base config"
+    if _VERBOSE:  # Guarded so the report is not even formatted in quiet runs
+        print("\n".join(f"  ✅ {dtype.value}: {memory_per_token:,.0f} bytes/token"
+                        for dtype, memory_per_token in zip(dtypes_to_test, dtype_memory)))
+    
+    # Cross-check the array result against the scalar path
+    for dtype, memory_per_token in zip(dtypes_to_test, dtype_memory):
+        config = replace(base_config, kvcache_dtype=dtype)
+        assert memory_per_token == CALC.calculate_kvcache_memory_per_token(config), \
+            f"All-dtype memory mismatch for {dtype.value}"
+    _log(f"  ✅ All-dtype memory per token matches for {len(dtypes_to_test)} data types")
+    
+    # Same sweep through the column layout, one model per dtype
+    dtype_batch = ModelConfigArray.from_configs([replace(base_config, kvcache_dtype=dtype) for dtype in dtypes_to_test])
+    assert np.array_equal(dtype_batch.memory_per_token(), dtype_memory), "Batch memory per token mismatch"
+    
+    # FP8 shares INT8's one-byte-per-element accounting
+    memory_by_dtype = dict(zip(dtypes_to_test, dtype_memory))
+    assert memory_by_dtype[KVCacheDtype.FP8] == memory_by_dtype[KVCacheDtype.INT8], \
+        "FP8 and INT8 should use the same KVCache memory"
+    
+    # Test quantization gains relative to an FP16 KVCache
+    system_config = SystemConfig(available_memory_gb=80.0)
+    conv_pattern = ConversationPattern(5.0, 2.0, 30.0, 1000)
+    fp16_metrics = CALC.calculate_detailed_metrics(base_config, system_config, conv_pattern)
+    int8_config = replace(base_config, kvcache_dtype=KVCacheDtype.INT8)
+    int8_metrics = CALC.calculate_detailed_metrics(int8_config, system_config, conv_pattern)
+    assert fp16_metrics.kv_compression_ratio == 1.0 and fp16_metrics.extra_tokens_vs_fp16 == 0, \
+        "FP16 should be its own baseline"
+    assert int8_metrics.kv_compression_ratio == 2.0, "INT8 should halve KVCache memory"
+    assert abs(int8_metrics.extra_tokens_vs_fp16 - int8_metrics.max_cached_tokens / 2) <= 1, \
+        "INT8 should cache twice as many tokens"
+    _log(f"  ✅ INT8 compression vs FP16: {int8_metrics.kv_compression_ratio:.1f}x, "
+          f"+{int8_metrics.extra_tokens_vs_fp16:,.0f} tokens")
 
 def test_optimization_scenarios():
     """Test optimization scenarios"""
-    print("🧪 Test optimization scenarios...")
-    
-    calculator = KVCacheCalculator()
+    _log("🧪 Test optimization scenarios...")
     
     # Test configuration
     model_config = ModelConfig(
@@ -183,11 +258,177 @@ def test_optimization_scenarios():
     # Test different target hit rates
     target_rates = [0.5, 0.7, 0.8, 0.9, 0.95]
     
-    for target_rate in target_rates:
-        optimization = calculator.optimize_memory_allocation(
+    optimization = CALC.optimize_memory_allocation_batch(
+        model_config, system_config, conv_pattern, target_hit_rates=target_rates
+    )
+    
+    for target_rate, recommended_memory_gb, achievable in zip(
+            target_rates, optimization['recommended_memory_gb'], optimization['achievable']):
+        _log(f"  ✅ Target hit rate {target_rate:.0%}: Recommended memory {recommended_memory_gb:.1f} GB")
+        
+        # The batch solver should agree with the scalar one
+        scalar_optimization = CALC.optimize_memory_allocation(
             model_config, system_config, conv_pattern, target_hit_rate=target_rate
         )
-        print(f"  ✅ Target hit rate {target_rate:.0%}: Recommended memory {optimization['recommended_memory_gb']:.1f} GB")
+        assert abs(recommended_memory_gb - scalar_optimization['recommended_memory_gb']) < 1e-9, \
+            f"Batch recommendation mismatch for target {target_rate:.0%}"
+        assert achievable == scalar_optimization['achievable'], \
+            f"Batch achievability mismatch for target {target_rate:.0%}"
+        
+        if target_rate > 1.0 - 1.0 / conv_pattern.avg_conversation_length:
+            assert not achievable, "Target above the intra-conversation ceiling should be unachievable"
+        else:
+            # The recommended memory should actually reach the target
+            recommended_system = SystemConfig(available_memory_gb=recommended_memory_gb)
+            achieved = CALC.calculate_conversation_hit_rate(model_config, recommended_system, conv_pattern)
+            assert achieved.hit_rate >= target_rate, \
+                f"Recommended memory reaches only {achieved.hit_rate:.1%} for target {target_rate:.0%}"
+    
+    # Fractional token counts must round up, or the recommendation floors to just below the target
+    mistral_config = ModelConfig(40, 32, 8, 128, ModelDtype.FP16, KVCacheDtype.FP16, 48.0)
+    odd_pattern = ConversationPattern(5.0, 2.0, 30.0, 999)
+    optimization = CALC.optimize_memory_allocation(mistral_config, system_config, odd_pattern, target_hit_rate=0.7)
+    recommended_system = SystemConfig(available_memory_gb=optimization['recommended_memory_gb'])
+    achieved = CALC.calculate_conversation_hit_rate(mistral_config, recommended_system, odd_pattern)
+    assert achieved.hit_rate >= 0.7, f"Recommended memory reaches only {achieved.hit_rate!r} for target 70%"
+    _log(f"  ✅ Recommendation rounds up to whole tokens: {achieved.hit_rate:.4%}")
+    
+    # A target already met reports the same fields as an unmet one and as the batch solver
+    met_optimization = CALC.optimize_memory_allocation(model_config, system_config, conv_pattern, target_hit_rate=0.0)
+    assert met_optimization.keys() == optimization.keys() == CALC.optimize_memory_allocation_batch(
+        model_config, system_config, conv_pattern, target_hit_rates=[0.0]).keys(), "Optimization fields differ"
+    assert met_optimization['achievable'] and met_optimization['additional_memory_needed_gb'] == 0, \
+        "A met target should need no additional memory"
+
+def test_batch_metrics():
+    """Test batch metrics against the scalar path"""
+    _log("🧪 Test batch metrics...")
+    
+    # Mistral-24B, Llama3-8B, Qwen3-32B (memory shortage) configurations
+    model_configs = [
+        ModelConfig(40, 32, 8, 128, ModelDtype.FP16, KVCacheDtype.FP16, 48.0),
+        ModelConfig(32, 32, 32, 128, ModelDtype.FP16, KVCacheDtype.FP16, 16.0),
+        ModelConfig(64, 64, 8, 128, ModelDtype.FP16, KVCacheDtype.FP16, 64.0),
+    ]
+    system_configs = [SystemConfig(80.0), SystemConfig(24.0), SystemConfig(80.0)]
+    conv_patterns = [
+        ConversationPattern(5.0, 2.0, 30.0, 1000),
+        ConversationPattern(10.0, 100.0, 1.0, 2000),
+        ConversationPattern(1.0, 0.1, 1.0, 100),
+    ]
+    
+    batch_metrics = CALC.calculate_detailed_metrics_batch(
+        ModelConfigArray.from_configs(model_configs),
+        SystemConfigArray.from_configs(system_configs),
+        ConversationPatternArray.from_patterns(conv_patterns)
+    )
+    
+    for i, configs in enumerate(zip(model_configs, system_configs, conv_patterns)):
+        scalar_metrics = CALC.calculate_detailed_metrics(*configs)
+        for field, batch_values, value in zip(scalar_metrics._fields, batch_metrics, scalar_metrics):
+            assert abs(batch_values[i] - value) <= 1e-9 * max(1.0, abs(value)), \
+                f"Batch mismatch for {field}: {batch_values[i]} != {value}"
+    _log(f"  ✅ Batch matches scalar for {len(model_configs)} configurations")
+    
+    # Memory × conversation pattern grid via broadcasting
+    memory_grid = [40.0, 80.0, 160.0]
+    grid_metrics = CALC.calculate_conversation_hit_rate_batch(
+        ModelConfigArray.from_configs(model_configs[:1]),
+        SystemConfigArray(available_memory_gb=np.array(memory_grid)[:, None]),
+        ConversationPatternArray.from_patterns(conv_patterns)
+    )
+    assert grid_metrics.hit_rate.shape == (len(memory_grid), len(conv_patterns)), "Grid shape mismatch"
+    for i, memory_gb in enumerate(memory_grid):
+        for j, conv_pattern in enumerate(conv_patterns):
+            scalar_metrics = CALC.calculate_conversation_hit_rate(
+                model_configs[0], SystemConfig(memory_gb), conv_pattern
+            )
+            assert abs(grid_metrics.hit_rate[i, j] - scalar_metrics.hit_rate) < 1e-9, "Grid hit rate mismatch"
+    _log(f"  ✅ Grid sweep matches scalar for {grid_metrics.hit_rate.size} points")
+    
+    # Reused output arrays across repeated sweeps
+    out = CALC.empty_hit_rate_batch(grid_metrics.hit_rate.shape)
+    for _ in range(2):
+        reused_metrics = CALC.calculate_conversation_hit_rate_batch(
+            ModelConfigArray.from_configs(model_configs[:1]),
+            SystemConfigArray(available_memory_gb=np.array(memory_grid)[:, None]),
+            ConversationPatternArray.from_patterns(conv_patterns),
+            out=out
+        )
+        assert reused_metrics is out, "Output arrays not reused"
+        for field, values, expected in zip(out._fields, out, grid_metrics):
+            assert np.array_equal(values, expected), f"Reused output mismatch for {field}"
+    _log("  ✅ Preallocated output arrays reused across sweeps")
+    
+    # GPU path, only when CuPy is installed
+    try:
+        gpu_metrics = CALC.calculate_detailed_metrics_batch(
+            ModelConfigArray.from_configs(model_configs),
+            SystemConfigArray.from_configs(system_configs),
+            ConversationPatternArray.from_patterns(conv_patterns),
+            use_gpu=True
+        )
+    except ImportError:
+        _log("  ⏭️ CuPy not installed, GPU batch skipped")
+    else:
+        assert np.allclose(gpu_metrics.hit_rate, batch_metrics.hit_rate), "GPU batch mismatch"
+        _log("  ✅ GPU batch matches CPU batch")
+
+def test_eviction_policies():
+    """Test eviction policy models"""
+    _log("🧪 Test eviction policies...")
+    
+    # Llama3-8B under cache pressure
+    model_config = ModelConfig(32, 32, 32, 128, ModelDtype.FP16, KVCacheDtype.FP16, 16.0)
+    conv_pattern = ConversationPattern(5.0, 2.0, 30.0, 1000)
+    system_configs = {
+        policy: SystemConfig(available_memory_gb=80.0, eviction_policy=policy,
+                             pinned_fraction=0.2 if policy == EvictionPolicy.PRIORITY else 0.0)
+        for policy in EvictionPolicy
+    }
+    
+    hit_rates = {policy: CALC.calculate_conversation_hit_rate(model_config, system_config, conv_pattern).hit_rate
+                 for policy, system_config in system_configs.items()}
+    for policy, hit_rate in hit_rates.items():
+        _log(f"  ✅ {policy.value}: {hit_rate:.1%}")
+    assert hit_rates[EvictionPolicy.W_TINYLFU] > hit_rates[EvictionPolicy.LRU], "W-TinyLFU should beat LRU under pressure"
+    assert hit_rates[EvictionPolicy.PRIORITY] > hit_rates[EvictionPolicy.LRU], "Pinning should beat LRU under pressure"
+    
+    for policy, system_config in system_configs.items():
+        # Batch path agrees with the scalar path
+        batch_metrics = CALC.calculate_conversation_hit_rate_batch(
+            ModelConfigArray.from_configs([model_config]),
+            SystemConfigArray.from_configs([system_config]),
+            ConversationPatternArray.from_patterns([conv_pattern])
+        )
+        assert abs(batch_metrics.hit_rate[0] - hit_rates[policy]) < 1e-9, f"Batch mismatch for {policy.value}"
+        
+        # The optimizer inverts each policy's model
+        optimization = CALC.optimize_memory_allocation(model_config, system_config, conv_pattern,
+                                                             target_hit_rate=0.7)
+        recommended_system = replace(system_config, available_memory_gb=optimization['recommended_memory_gb'])
+        achieved = CALC.calculate_conversation_hit_rate(model_config, recommended_system, conv_pattern)
+        assert achieved.hit_rate >= 0.7, f"{policy.value}: recommended memory reaches only {achieved.hit_rate:.1%}"
+    _log("  ✅ Batch and optimizer consistent for every policy")
+    
+    # Pinning alone covers the target, but the recommendation still needs some KVCache
+    pinned_model_config = ModelConfig(40, 32, 8, 128, ModelDtype.FP16, KVCacheDtype.FP16, 48.0)
+    pinned_system_config = SystemConfig(50.0, EvictionPolicy.PRIORITY, pinned_fraction=0.9)
+    optimization = CALC.optimize_memory_allocation(pinned_model_config, pinned_system_config, conv_pattern,
+                                                   target_hit_rate=0.5)
+    recommended_system = replace(pinned_system_config, available_memory_gb=optimization['recommended_memory_gb'])
+    achieved = CALC.calculate_conversation_hit_rate(pinned_model_config, recommended_system, conv_pattern)
+    assert optimization['achievable'] and achieved.hit_rate >= 0.5, \
+        f"Pinned recommendation reaches only {achieved.hit_rate:.1%}"
+    assert achieved.max_cached_tokens == 1, "Pinning alone needs only a single token of KVCache"
+    _log(f"  ✅ Pinned-only target reached with {optimization['recommended_memory_gb']:.1f} GB")
+    
+    try:
+        SystemConfig(available_memory_gb=80.0, pinned_fraction=1.5)
+    except ValueError:
+        _log("  ✅ Invalid pinned fraction rejected")
+    else:
+        raise AssertionError("pinned_fraction above 1 should be rejected")
 
 def run_all_tests():
     """Run all tests"""
@@ -207,9 +448,15 @@ def run_all_tests():
         test_optimization_scenarios()
         print("✅ Optimization scenarios test passed\n")
         
+        test_batch_metrics()
+        print("✅ Batch metrics test passed\n")
+        
+        test_eviction_policies()
+        print("✅ Eviction policies test passed\n")
+        
         print("=" * 50)
-        passed_tests = 4
-        total_tests = 4
+        passed_tests = 6
+        total_tests = 6
         print(f"📊 Test results: {passed_tests}/{total_tests} passed")
         print("🎉 All tests passed! Calculator functionality is normal")
         